@@ -1,30 +1,386 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
 import os
+
+# Tesseract's internal OpenMP threading fights with our process pool; keep each
+# Tesseract single-threaded and parallelize across pages instead.
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+from flask import Flask, Response, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
+from flask_cors import CORS
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
 import tempfile
+import shutil
 import json
-from werkzeug.utils import secure_filename
-from ocr import extract_document_text
+import orjson
+import tiktoken
+import functools
+import hashlib
+import time
+import re
+import uuid
+import threading
+import multiprocessing
+from collections.abc import Mapping
+from contextlib import suppress
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from ulid import ULID
+from ocr import ocr_document_pages, scan_document_pages
 from llm_summarizer import create_document_summary
-from kmrl_classifier import classify_railway_document
+from kmrl_classifier import classify_railway_document, count_railway_keywords
+from chat_cache import ChatResponseCache
 import load_env  # Load environment variables
-import time
 from datetime import datetime
 
+class PagesSoA(Mapping):
+    """
+    Pages of all processed files, stored as parallel lists (one per field)
+    instead of a dict per page.
+    
+    Reads as the {global page number: page info} mapping expected by
+    create_document_summary; a page's dict is only built when it is accessed.
+    Global page numbers are assigned sequentially from 1.
+    """
+    __slots__ = ('page_nums', 'source_files', 'languages', 'methods', 'texts')
+    
+    def __init__(self):
+        self.page_nums = []
+        self.source_files = []
+        self.languages = []
+        self.methods = []
+        self.texts = []
+    
+    def __len__(self):
+        return len(self.page_nums)
+    
+    def __iter__(self):
+        return iter(range(1, len(self.page_nums) + 1))
+    
+    def __getitem__(self, global_num):
+        if not isinstance(global_num, int) or not 1 <= global_num <= len(self.page_nums):
+            raise KeyError(global_num)
+        
+        index = global_num - 1
+        return {
+            'page_num': self.page_nums[index],
+            'global_page_num': global_num,
+            'source_file': self.source_files[index],
+            'language': self.languages[index],
+            'method': self.methods[index],
+            'text': self.texts[index]
+        }
+    
+    def append(self, source_file, page_info):
+        self.page_nums.append(page_info['page_num'])
+        self.source_files.append(source_file)
+        self.languages.append(page_info.get('language', 'unknown'))
+        self.methods.append(page_info.get('method'))
+        self.texts.append(page_info['text'])
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, which is much faster on large OCR text."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)  # Enable CORS for all routes
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
+RESULTS_FOLDER = 'results'
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+MAX_REQUEST_SIZE = MAX_FILE_SIZE + 64 * 1024  # Room for multipart headers and form fields
+MAX_OCR_WORKERS = os.cpu_count() or 1
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1MB
+MAX_PROCESSING_JOBS = int(os.getenv('MAX_PROCESSING_JOBS', '2'))
+PROCESSING_JOB_TTL = int(os.getenv('PROCESSING_JOB_TTL', '3600'))  # 1 hour
+OCR_PREVIEW_CHARS = 2000
+MAX_CONTEXT_TOKENS = int(os.getenv('MAX_CONTEXT_TOKENS', '1000'))
+MAX_CHARS_PER_TOKEN = 16  # Tokens rarely span more characters than this
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', '86400'))  # 1 day, also how long results stay downloadable
+
+# Downloadable result files: data type -> download filename
+RESULT_DOWNLOADS = {
+    'ocr': 'ocr_results.txt',
+    'summary': 'ai_summary.txt'
+}
+
+# Let Werkzeug refuse oversized bodies before they are spooled to disk
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_SIZE
+
+@app.errorhandler(HTTPException)
+def http_error(e):
+    """
+    Answer HTTP errors raised by Flask/Werkzeug (e.g. malformed JSON or an
+    oversized body) with a JSON error like the API's own, not an HTML page.
+    """
+    if isinstance(e, RequestEntityTooLarge):
+        return jsonify({'error': 'Total file size exceeds limit'}), 413
+    
+    return jsonify({'error': e.description}), e.code
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(RESULTS_FOLDER, exist_ok=True)
+
+# Background document processing jobs: task id -> {'future', 'finished_at'}
+processing_executor = ThreadPoolExecutor(max_workers=MAX_PROCESSING_JOBS)
+processing_jobs = {}
+
+# OCR process pool shared by all jobs, so concurrent jobs queue for the same
+# MAX_OCR_WORKERS processes instead of each starting their own; started on first use
+ocr_executor = None
+ocr_executor_lock = threading.Lock()
+
+# Cache of LLM chat responses per document
+chat_cache = ChatResponseCache()
+
+SYSTEM_PROMPT = """You are an AI assistant specialized in analyzing railway documents. You have access to processed document data including OCR text, summaries, and classifications. 
+
+Your role is to:
+1. Answer questions about the railway documents based on the provided context
+2. Provide specific information extraction when asked
+3. Explain railway terminology and concepts
+4. Help with compliance and safety-related queries
+5. Provide insights about document structure and content
+
+Be accurate, helpful, and specific in your responses. If you don't have enough information to answer a question, say so clearly. Format your responses in a clear, readable manner with bullet points or sections when appropriate."""
+
+# Fallback chat topics, matched in one pass and resolved in priority order
+FALLBACK_TOPIC_RE = re.compile(
+    r'(?P<type>type|document)|(?P<date>date|schedule)|'
+    r'(?P<safety>safety|compliance)|(?P<summary>summarize|summary)',
+    re.IGNORECASE
+)
+FALLBACK_TOPIC_PRIORITY = ('type', 'date', 'safety', 'summary')
+
+# Characters replaced when storing uploads (only pdf/png/jpg/jpeg names are accepted)
+UNSAFE_FILENAME_RE = re.compile(r'[^A-Za-z0-9._-]')
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+@functools.lru_cache(maxsize=1)
+def get_openai_client(base_url, api_key):
+    """
+    Return a shared OpenAI client so its HTTP connection pool is reused
+    across chat requests.
+    """
+    from openai import OpenAI
+    
+    return OpenAI(base_url=base_url, api_key=api_key)
+
+@functools.lru_cache(maxsize=1)
+def get_tokenizer():
+    """
+    Return the tokenizer of the chat model, falling back to the GPT-4o
+    encoding for model names tiktoken doesn't know.
+    
+    Returns None if the encoding can't be loaded (tiktoken downloads it on
+    first use); the failure is cached too, so requests don't retry it.
+    """
+    model = os.getenv("GITHUB_MODEL_NAME", "gpt-4o").rsplit('/', 1)[-1]
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding('o200k_base')
+    except Exception as e:
+        print(f"Could not load tokenizer, truncating by characters instead: {str(e)}")
+        return None
+
+def truncate_to_tokens(text, max_tokens):
+    """
+    Cut text down to at most max_tokens tokens.
+    
+    Returns a (text, was_truncated) tuple.
+    """
+    encoding = get_tokenizer()
+    if encoding is None:
+        # Without a tokenizer, allow one character per token: near the limit
+        # for Malayalam and well under it for English
+        return text[:max_tokens], len(text) > max_tokens
+    
+    # Encoding a bounded prefix is enough to find the cut point in long documents
+    prefix = text[:max_tokens * MAX_CHARS_PER_TOKEN]
+    tokens = encoding.encode(prefix)
+    if len(tokens) <= max_tokens and len(prefix) < len(text):
+        tokens = encoding.encode(text)
+    
+    if len(tokens) <= max_tokens:
+        return text, False
+    
+    return encoding.decode(tokens[:max_tokens]), True
+
+def create_ocr_executor():
+    """
+    Start a pool of OCR worker processes.
+    
+    Workers come from a forkserver (spawn where that is unavailable) instead of
+    being forked from this multithreaded server, where a child could inherit a
+    lock held by another thread.
+    """
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=MAX_OCR_WORKERS, mp_context=multiprocessing.get_context(start_method))
+
+def submit_ocr_task(fn, *args, **kwargs):
+    """
+    Submit a task to the shared OCR pool, replacing the pool if a worker
+    died (e.g. was killed for running out of memory) and broke it.
+    """
+    global ocr_executor
+    
+    with ocr_executor_lock:
+        if ocr_executor is None:
+            ocr_executor = create_ocr_executor()
+        
+        try:
+            return ocr_executor.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            ocr_executor = create_ocr_executor()
+            return ocr_executor.submit(fn, *args, **kwargs)
+
+def evict_finished_jobs():
+    """
+    Forget jobs that finished more than PROCESSING_JOB_TTL ago.
+    """
+    cutoff = time.time() - PROCESSING_JOB_TTL
+    
+    for task_id, job in list(processing_jobs.items()):
+        if job['finished_at'] is not None and job['finished_at'] < cutoff:
+            processing_jobs.pop(task_id, None)
+
+def cleanup_results():
+    """
+    Delete stored results (downloads and cached processing results) older
+    than RESULT_CACHE_TTL, so RESULTS_FOLDER doesn't grow without bound.
+    
+    Cached results point at their job's download files; both expire after
+    the same TTL, and the cache entry is always written last.
+    """
+    cutoff = time.time() - RESULT_CACHE_TTL
+    
+    with os.scandir(RESULTS_FOLDER) as entries:
+        for entry in entries:
+            with suppress(FileNotFoundError):
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+
+def json_response(data, status=200):
+    """
+    Build a JSON response straight from orjson bytes, skipping the
+    str round trip that jsonify goes through.
+    """
+    return Response(orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS), status=status, mimetype='application/json')
+
+def result_path(job_id, data_type):
+    return os.path.join(RESULTS_FOLDER, f"{job_id}.{data_type}.txt")
+
+def read_result_text(job_id, data_type, max_chars=-1):
+    """
+    Read a stored processing result (at most max_chars characters of it),
+    or return None if it doesn't exist.
+    """
+    if not job_id or not str(job_id).isalnum():
+        return None
+    
+    try:
+        with open(result_path(job_id, data_type), 'r', encoding='utf-8') as f:
+            return f.read(max_chars)
+    except FileNotFoundError:
+        return None
+
+def save_upload(file, filepath, max_size):
+    """
+    Stream an uploaded file to disk in large chunks.
+    
+    Returns the number of bytes written, or None if the file grew past
+    max_size (the partial file is removed).
+    """
+    written = 0
+    with open(filepath, 'wb', buffering=UPLOAD_CHUNK_SIZE) as out:
+        while True:
+            chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            
+            written += len(chunk)
+            if written > max_size:
+                break
+            
+            out.write(chunk)
+    
+    if written > max_size:
+        os.remove(filepath)
+        return None
+    
+    return written
+
+def hash_file(path):
+    """
+    Return the SHA-256 hex digest of a file, read in large chunks.
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            sha.update(chunk)
+    
+    return sha.hexdigest()
+
+def result_cache_key(files, ocr_language, classification_mode):
+    """
+    Key processing results by upload names, contents and options, or return
+    None if there are no files. Names are part of the key because the
+    combined text carries a header per document.
+    
+    Contents are hashed here rather than trusted from the request, so a
+    client can't store one file's results under another file's key.
+    """
+    if not files:
+        return None
+    
+    uploads = [(file_info.get('original_name'), hash_file(file_info['path'])) for file_info in files]
+    return hashlib.sha256(orjson.dumps([ocr_language, classification_mode, uploads])).hexdigest()
+
+def read_cached_result(cache_key):
+    """
+    Return the cached processing result for cache_key, or None if it is
+    missing, unreadable or older than RESULT_CACHE_TTL. Expired and corrupt
+    entries are deleted.
+    """
+    if cache_key is None:
+        return None
+    
+    path = os.path.join(RESULTS_FOLDER, f"{cache_key}.result.json")
+    try:
+        if time.time() - os.path.getmtime(path) <= RESULT_CACHE_TTL:
+            with open(path, 'rb') as f:
+                return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, orjson.JSONDecodeError) as e:
+        print(f"Discarding unreadable cached result {cache_key}: {e}")
+    
+    with suppress(FileNotFoundError):
+        os.remove(path)
+    return None
+
+def write_cached_result(cache_key, result):
+    if cache_key is None:
+        return
+    
+    path = os.path.join(RESULTS_FOLDER, f"{cache_key}.result.json")
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(orjson.dumps(result))
+    os.replace(tmp_path, path)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
@@ -32,6 +388,10 @@ def health_check():
 @app.route('/api/upload', methods=['POST'])
 def upload_files():
     try:
+        # Reject oversized requests before touching (and parsing) the files
+        if request.content_length and request.content_length > MAX_REQUEST_SIZE:
+            return jsonify({'error': 'Total file size exceeds limit'}), 413
+        
         if 'files' not in request.files:
             return jsonify({'error': 'No files provided'}), 400
         
@@ -47,21 +407,16 @@ def upload_files():
         
         for file in files:
             if file and allowed_file(file.filename):
-                # Check file size
-                file.seek(0, 2)  # Seek to end
-                file_size = file.tell()
-                file.seek(0)  # Reset to beginning
-                
-                total_size += file_size
-                if total_size > MAX_FILE_SIZE:
-                    return jsonify({'error': 'Total file size exceeds limit'}), 400
-                
-                filename = secure_filename(file.filename)
-                timestamp = str(int(time.time()))
-                filename = f"{timestamp}_{filename}"
+                # ULID prefix keeps names unique even for uploads in the same second
+                filename = f"{ULID()}_{UNSAFE_FILENAME_RE.sub('_', file.filename)}"
                 
+                # Save file, enforcing the total size limit while streaming
                 filepath = os.path.join(UPLOAD_FOLDER, filename)
-                file.save(filepath)
+                file_size = save_upload(file, filepath, MAX_FILE_SIZE - total_size)
+                if file_size is None:
+                    return jsonify({'error': 'Total file size exceeds limit'}), 413
+                
+                total_size += file_size
                 
                 uploaded_files.append({
                     'filename': filename,
@@ -80,6 +435,9 @@ def upload_files():
             'classification_mode': classification_mode
         })
         
+    except HTTPException:
+        # Let http_error answer with the right status (e.g. 413 for an oversized body)
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -95,69 +453,179 @@ def process_documents():
         ocr_language = data.get('ocr_language', 'mal+eng')
         classification_mode = data.get('classification_mode', 'railway')
         
-        # Create temporary output directory
-        output_dir = tempfile.mkdtemp()
+        evict_finished_jobs()
+        cleanup_results()
         
-        all_page_texts = {}
-        combined_text = ""
-        page_counter = 1
+        # Run processing in the background and let the client poll for the result
+        task_id = uuid.uuid4().hex
+        future = processing_executor.submit(
+            run_document_processing, task_id, files, ocr_language, classification_mode
+        )
+        job = processing_jobs[task_id] = {'future': future, 'finished_at': None}
         
-        # Process each file
-        for file_info in files:
-            filepath = file_info['path']
+        # Record when the job finished so it can be evicted later
+        future.add_done_callback(lambda _: job.update(finished_at=time.time()))
+        
+        return jsonify({'task_id': task_id, 'status': 'processing'}), 202
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+@app.route('/api/process/status/<task_id>', methods=['GET'])
+def process_status(task_id):
+    job = processing_jobs.get(task_id)
+    
+    if job is None:
+        return jsonify({'error': 'Unknown task'}), 404
+    
+    future = job['future']
+    
+    # Finished jobs stay until evict_finished_jobs expires them, so a
+    # retried poll still gets the result
+    if not future.done():
+        return jsonify({'task_id': task_id, 'status': 'processing'})
+    
+    try:
+        result, status_code = future.result()
+    except Exception as e:
+        return jsonify({'task_id': task_id, 'status': 'failed', 'error': f'Processing failed: {str(e)}'}), 500
+    
+    if status_code != 200:
+        return jsonify({'task_id': task_id, 'status': 'failed', **result}), status_code
+    
+    return json_response({'task_id': task_id, 'status': 'completed', 'result': result})
+
+def run_document_processing(job_id, files, ocr_language, classification_mode):
+    """
+    Run OCR, summarization and classification for uploaded files.
+    
+    The full OCR text and summary are stored under RESULTS_FOLDER for
+    download; the response only carries a preview of the OCR text.
+    
+    Returns a (response body, HTTP status code) tuple.
+    """
+    # Create temporary output directory
+    output_dir = tempfile.mkdtemp()
+    
+    try:
+        valid_files = [f for f in files if os.path.exists(f['path'])]
+        
+        # Identical uploads with the same options reuse the earlier result;
+        # only when every file is present, since the result covers them all
+        cache_key = None
+        if len(valid_files) == len(files):
+            cache_key = result_cache_key(valid_files, ocr_language, classification_mode)
+        cached_result = read_cached_result(cache_key)
+        if cached_result is not None:
+            return cached_result, 200
+        
+        pages = PagesSoA()
+        combined_parts = []
+        
+        file_output_dirs = [os.path.join(output_dir, f"file_{index}") for index in range(len(valid_files))]
+        documents = [None] * len(valid_files)
+        
+        if valid_files:
+            # Read the embedded text of all files in parallel
+            scan_futures = [
+                submit_ocr_task(scan_document_pages, file_info['path'], file_output_dir)
+                for file_info, file_output_dir in zip(valid_files, file_output_dirs)
+            ]
+            for index, future in enumerate(scan_futures):
+                try:
+                    documents[index] = future.result()
+                except Exception as e:
+                    print(f"Error processing file {valid_files[index]['path']}: {str(e)}")
             
-            if not os.path.exists(filepath):
-                continue
+            # Split the scanned pages of all files evenly across the workers, so
+            # even a single long scan is OCR'd on every core; each chunk is one
+            # Tesseract invocation
+            ocr_slots = [
+                (index, page_num)
+                for index, page_infos in enumerate(documents) if page_infos
+                for page_num, page_info in page_infos.items() if page_info is None
+            ]
+            chunk_count = min(len(ocr_slots), MAX_OCR_WORKERS)
+            futures = {}
             
-            try:
-                # Extract text from document
-                page_texts, file_combined_text = extract_document_text(
-                    file_path=filepath,
-                    output_dir=output_dir,
-                    tesseract_langs=ocr_language
+            for chunk in range(chunk_count):
+                slots = ocr_slots[len(ocr_slots) * chunk // chunk_count:len(ocr_slots) * (chunk + 1) // chunk_count]
+                future = submit_ocr_task(
+                    ocr_document_pages,
+                    [(valid_files[index]['path'], page_num, file_output_dirs[index]) for index, page_num in slots],
+                    work_dir=os.path.join(output_dir, f"ocr_{chunk}"),
+                    tesseract_langs=ocr_language,
+                    thread_count=max(1, MAX_OCR_WORKERS // chunk_count)
                 )
-                
-                # Renumber pages to be sequential across all files
-                for original_page_num, page_info in page_texts.items():
-                    page_info['global_page_num'] = page_counter
-                    page_info['source_file'] = file_info['original_name']
-                    all_page_texts[page_counter] = page_info
-                    page_counter += 1
-                
-                combined_text += f"\n\n--- Document: {file_info['original_name']} ---\n\n"
-                combined_text += file_combined_text
-                
-            except Exception as e:
-                print(f"Error processing file {filepath}: {str(e)}")
+                futures[future] = slots
+            
+            for future in as_completed(futures):
+                try:
+                    for (index, page_num), page_info in zip(futures[future], future.result()):
+                        documents[index][page_num] = page_info
+                except Exception as e:
+                    print(f"Error running OCR: {str(e)}")
+        
+        # Renumber pages to be sequential across all files, in upload order
+        for file_info, page_infos in zip(valid_files, documents):
+            # Pages whose OCR failed are left out
+            page_texts = [page_info for page_info in (page_infos or {}).values() if page_info is not None]
+            if not page_texts:
                 continue
         
-        if not all_page_texts:
-            return jsonify({'error': 'Failed to extract text from any documents'}), 500
+            for page_info in page_texts:
+                pages.append(file_info['original_name'], page_info)
+        
+            combined_parts.append(f"\n\n--- Document: {file_info['original_name']} ---\n\n")
+            combined_parts.append("\n\n".join(page_info['marked_text'] for page_info in page_texts))
+        
+        # The page text now lives in pages and combined_text; release the
+        # per-file results (including the loop's last references) and the parts
+        documents = page_infos = page_texts = None
+        combined_text = "".join(combined_parts)
+        del combined_parts
         
-        # Generate AI summary
-        summary_data = create_document_summary(all_page_texts, combined_text, output_dir)
+        if not pages:
+            return {'error': 'Failed to extract text from any documents'}, 500
+        
+        classify = classification_mode in ['railway', 'both']
+        
+        # Generate AI summary while the OCR text is scanned for classification
+        # keywords; only the summary's own keywords are left for afterwards
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            summary_future = executor.submit(create_document_summary, pages, combined_text, output_dir)
+            keywords_future = executor.submit(count_railway_keywords, combined_text) if classify else None
+        
+            summary_data = summary_future.result()
         
         # Perform railway classification
         classifications = []
-        if classification_mode in ['railway', 'both']:
+        if classify:
             classifications = classify_railway_document(
                 combined_text, 
-                summary_data.get('overall_summary', '')
+                summary_data.get('overall_summary', ''),
+                keywords_future.result()
             )
         
+        # Store full results for download
+        with open(result_path(job_id, 'ocr'), 'w', encoding='utf-8') as f:
+            f.write(combined_text)
+        with open(result_path(job_id, 'summary'), 'w', encoding='utf-8') as f:
+            f.write(summary_data.get('overall_summary', ''))
+        
         # Prepare response
         result = {
+            'job_id': job_id,
             'document_type': summary_data.get('document_type', 'Unknown'),
-            'ocr_text': combined_text,
+            'ocr_text': combined_text[:OCR_PREVIEW_CHARS],
             'summary': summary_data.get('overall_summary', ''),
             'classification': classifications,
             'metadata': {
-                'total_pages': len(all_page_texts),
+                'total_pages': len(pages),
                 'total_characters': len(combined_text),
-                'languages_detected': list(set(
-                    page_info.get('language', 'unknown') 
-                    for page_info in all_page_texts.values()
-                )),
+                'languages_detected': list(set(pages.languages)),
                 'processing_time': f"{len(files)} file(s) processed",
                 'files_processed': len(files),
                 'ocr_language': ocr_language,
@@ -167,89 +635,108 @@ def process_documents():
             'error': summary_data.get('error')
         }
         
-        # Clean up uploaded files
-        for file_info in files:
-            try:
-                if os.path.exists(file_info['path']):
-                    os.remove(file_info['path'])
-            except:
-                pass
+        # Don't cache failed summaries (e.g. missing token) so they can be retried
+        if not result['error']:
+            write_cached_result(cache_key, result)
         
-        return jsonify(result)
+        return result, 200
         
-    except Exception as e:
-        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+    finally:
+        # Clean up uploaded files and intermediate OCR output, even on failure
+        for file_info in files:
+            with suppress(FileNotFoundError):
+                os.unlink(file_info['path'])
+        
+        shutil.rmtree(output_dir, ignore_errors=True)
 
 def generate_chat_response(message: str, processed_data: dict) -> str:
     """
     Generate AI chat response using the LLM service
     """
     try:
-        from openai import OpenAI
-        
         # Get GitHub token
         token = os.getenv("GITHUB_TOKEN")
         if not token:
             return "I need a GitHub token to be configured to provide intelligent responses. Please check the environment configuration."
         
-        # Initialize OpenAI client with GitHub endpoint
-        client = OpenAI(
-            base_url=os.getenv("GITHUB_MODELS_ENDPOINT", "https://models.github.ai"),
-            api_key=token
+        processed_data = processed_data or {}
+        job_id = processed_data.get('job_id')
+        
+        # A processed job identifies its document, so only documents without
+        # one need their text hashed for the cache key
+        if job_id and str(job_id).isalnum():
+            doc_key = f"job-{job_id}"
+        else:
+            doc_key = chat_cache.document_key(processed_data.get('ocr_text', ''))
+        
+        # Reuse the answer if this question was already asked about this document
+        cached_response = chat_cache.get(doc_key, message)
+        if cached_response is not None:
+            return cached_response
+        
+        # Prefer the stored full OCR text over the preview sent by the client.
+        # Only a prefix can fit in the context, so don't read the whole file;
+        # one extra character tells whether the document goes on
+        context_chars = MAX_CONTEXT_TOKENS * MAX_CHARS_PER_TOKEN
+        ocr_text = read_result_text(job_id, 'ocr', context_chars + 1) or processed_data.get('ocr_text', '')
+        text_continues = len(ocr_text) > context_chars
+        ocr_text = ocr_text[:context_chars]
+        
+        # Reuse the OpenAI client for the GitHub endpoint
+        client = get_openai_client(
+            os.getenv("GITHUB_MODELS_ENDPOINT", "https://models.github.ai"),
+            token
         )
         
         # Prepare context from processed document data
-        context = ""
+        context_parts = []
         if processed_data:
             if processed_data.get('document_type'):
-                context += f"Document Type: {processed_data['document_type']}\n\n"
+                context_parts.append(f"Document Type: {processed_data['document_type']}\n\n")
             
             if processed_data.get('summary'):
-                context += f"Document Summary: {processed_data['summary']}\n\n"
+                context_parts.append(f"Document Summary: {processed_data['summary']}\n\n")
             
             if processed_data.get('classification'):
                 classifications = processed_data['classification']
                 if classifications:
-                    context += "Railway Classifications:\n"
+                    context_parts.append("Railway Classifications:\n")
                     for cls in classifications:
-                        context += f"- {cls.get('category', 'Unknown')}: {cls.get('confidence', 0):.2f} confidence\n"
+                        context_parts.append(f"- {cls.get('category', 'Unknown')}: {cls.get('confidence', 0):.2f} confidence\n")
                         if cls.get('keywords'):
-                            context += f"  Keywords: {', '.join(cls['keywords'])}\n"
-                    context += "\n"
+                            context_parts.append(f"  Keywords: {', '.join(cls['keywords'])}\n")
+                    context_parts.append("\n")
             
             if processed_data.get('key_information'):
                 key_info = processed_data['key_information']
-                context += "Key Information:\n"
+                context_parts.append("Key Information:\n")
                 for key, value in key_info.items():
-                    context += f"- {key}: {value}\n"
-                context += "\n"
+                    context_parts.append(f"- {key}: {value}\n")
+                context_parts.append("\n")
             
             # Add a portion of the OCR text for context (limit to avoid token limits)
-            ocr_text = processed_data.get('ocr_text', '')
             if ocr_text:
-                # Limit OCR text to first 2000 characters for context
-                ocr_preview = ocr_text[:2000]
-                if len(ocr_text) > 2000:
+                # Limit OCR text by tokens, not characters: Malayalam text
+                # takes several tokens per character
+                ocr_preview, truncated = truncate_to_tokens(ocr_text, MAX_CONTEXT_TOKENS)
+                if truncated or text_continues:
                     ocr_preview += "...\n[Document continues]"
-                context += f"Document Content (Preview):\n{ocr_preview}\n\n"
+                context_parts.append(f"Document Content (Preview):\n{ocr_preview}\n\n")
         
-        # Create the system prompt
-        system_prompt = """You are an AI assistant specialized in analyzing railway documents. You have access to processed document data including OCR text, summaries, and classifications. 
-
-Your role is to:
-1. Answer questions about the railway documents based on the provided context
-2. Provide specific information extraction when asked
-3. Explain railway terminology and concepts
-4. Help with compliance and safety-related queries
-5. Provide insights about document structure and content
-
-Be accurate, helpful, and specific in your responses. If you don't have enough information to answer a question, say so clearly. Format your responses in a clear, readable manner with bullet points or sections when appropriate."""
+        context = "".join(context_parts)
+        
+        # Keep everything that is stable for a document (instructions, then
+        # document context) ahead of the question, so the provider's prompt
+        # prefix cache can be reused across questions about the same document.
+        # The context holds uploaded text, so it goes in a user turn rather
+        # than with the system instructions
+        document_prompt = f"""Document ID: {doc_key}
 
-        # Create the user prompt with context
-        user_prompt = f"""Context from processed railway documents:
-{context}
+Context from processed railway documents:
+{context}"""
 
-User Question: {message}
+        # Create the user prompt with only the per-question data
+        user_prompt = f"""User Question: {message}
 
 Please provide a helpful and accurate response based on the document context above."""
 
@@ -257,14 +744,18 @@ Please provide a helpful and accurate response based on the document context abo
         response = client.chat.completions.create(
             model=os.getenv("GITHUB_MODEL_NAME", "gpt-4o"),
             messages=[
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": document_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             max_tokens=800,
             temperature=0.3
         )
         
-        return response.choices[0].message.content.strip()
+        response_text = response.choices[0].message.content.strip()
+        chat_cache.put(doc_key, message, response_text)
+        
+        return response_text
         
     except Exception as e:
         print(f"Error generating chat response: {str(e)}")
@@ -275,19 +766,20 @@ def generate_fallback_response(message: str, processed_data: dict) -> str:
     """
     Generate fallback responses when AI is unavailable
     """
-    message_lower = message.lower()
+    topics = {match.lastgroup for match in FALLBACK_TOPIC_RE.finditer(message)}
+    topic = next((t for t in FALLBACK_TOPIC_PRIORITY if t in topics), None)
     
-    if 'type' in message_lower or 'document' in message_lower:
+    if topic == 'type':
         doc_type = processed_data.get('document_type', 'Railway Document')
         return f"Based on my analysis, this appears to be a **{doc_type}**. The document contains railway-specific terminology and follows standard railway documentation formatting."
     
-    elif 'date' in message_lower or 'schedule' in message_lower:
+    elif topic == 'date':
         return "I've analyzed the document for dates and schedules. To provide specific information, I would need access to the AI service. Please ensure your GitHub token is configured correctly."
     
-    elif 'safety' in message_lower or 'compliance' in message_lower:
+    elif topic == 'safety':
         return "The document contains safety and compliance information. For detailed analysis, please ensure the AI service is properly configured with your GitHub token."
     
-    elif 'summarize' in message_lower or 'summary' in message_lower:
+    elif topic == 'summary':
         summary = processed_data.get('summary', '')
         if summary:
             return summary
@@ -315,6 +807,8 @@ def chat_with_documents():
             'timestamp': datetime.now().isoformat()
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -338,8 +832,27 @@ def download_data(data_type):
             'content_type': 'text/plain'
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/download/<job_id>/<data_type>', methods=['GET'])
+def download_result(job_id, data_type):
+    if data_type not in RESULT_DOWNLOADS or not job_id.isalnum():
+        return jsonify({'error': 'Invalid data type'}), 400
+    
+    filepath = result_path(job_id, data_type)
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'Result not found'}), 404
+    
+    return send_file(
+        os.path.abspath(filepath),
+        mimetype='text/plain',
+        as_attachment=True,
+        download_name=RESULT_DOWNLOADS[data_type],
+        conditional=True
+    )
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""
+HTTP session shared by the backend test scripts
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+import orjson
+
+
+class BackendSession(requests.Session):
+    """Session that reuses connections to the backend, one per concurrent request"""
+
+    def __init__(self, max_concurrent_requests):
+        super().__init__()
+        self.mount('http://', HTTPAdapter(pool_maxsize=max_concurrent_requests))
+
+    def post_json(self, url, payload, timeout=30):
+        """POST a JSON payload, encoded with orjson rather than the stdlib json module"""
+        return self.post(
+            url,
+            data=orjson.dumps(payload),
+            headers={'Content-Type': 'application/json'},
+            timeout=timeout
+        )
@@ -0,0 +1,106 @@
+"""
+Response cache for document chat.
+This module lets repeated questions about the same document reuse the earlier
+LLM answer instead of making another round trip to the model.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class ChatResponseCache:
+    """
+    In-process LRU cache of chat responses, keyed by document and question.
+
+    Questions are normalized (case, punctuation and whitespace) before lookup,
+    so repeats differing only in those hit the same entry; matching is otherwise exact.
+    """
+
+    def __init__(self, max_entries_per_document: int = 1000, max_documents: int = 100):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries_per_document: Responses kept per document before LRU eviction
+            max_documents: Documents kept before the least recently used one is dropped
+        """
+        self.max_entries_per_document = max_entries_per_document
+        self.max_documents = max_documents
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+        self._punct_re = re.compile(r'[^\w\s]+')
+
+    @staticmethod
+    def document_key(ocr_text: str) -> str:
+        """
+        Build a short stable identifier for a document's OCR text.
+
+        Args:
+            ocr_text: Full OCR text of the document
+
+        Returns:
+            Hex digest identifying the document
+        """
+        return hashlib.sha256(ocr_text.encode('utf-8')).hexdigest()[:16]
+
+    def normalize_message(self, message: str) -> str:
+        """
+        Normalize a chat message for cache lookup.
+
+        Args:
+            message: User question
+
+        Returns:
+            Normalized question
+        """
+        return ' '.join(self._punct_re.sub(' ', message.lower()).split())
+
+    def get(self, doc_key: str, message: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            doc_key: Document identifier from document_key()
+            message: User question
+
+        Returns:
+            Cached response, or None on a miss
+        """
+        question = self.normalize_message(message)
+
+        with self._lock:
+            entries = self._documents.get(doc_key)
+            if entries is None or question not in entries:
+                return None
+
+            self._documents.move_to_end(doc_key)
+            entries.move_to_end(question)
+            return entries[question]
+
+    def put(self, doc_key: str, message: str, response: str):
+        """
+        Store a response for a question about a document.
+
+        Args:
+            doc_key: Document identifier from document_key()
+            message: User question
+            response: LLM response to cache
+        """
+        question = self.normalize_message(message)
+
+        with self._lock:
+            entries = self._documents.get(doc_key)
+            if entries is None:
+                entries = self._documents[doc_key] = OrderedDict()
+                if len(self._documents) > self.max_documents:
+                    self._documents.popitem(last=False)
+            else:
+                self._documents.move_to_end(doc_key)
+
+            entries[question] = response
+            entries.move_to_end(question)
+            if len(entries) > self.max_entries_per_document:
+                entries.popitem(last=False)
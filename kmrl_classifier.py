@@ -5,8 +5,18 @@ and content patterns.
 """
 
 import re
+import bisect
+import functools
+import hashlib
+import threading
 from typing import Dict, List, Tuple
-from collections import defaultdict
+from collections import Counter, OrderedDict, defaultdict
+from operator import itemgetter
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is optional; fall back to per-keyword scans
+    ahocorasick = None
 
 class RailwayDocumentClassifier:
     """
@@ -14,6 +24,10 @@ class RailwayDocumentClassifier:
     and keyword matching for railway-specific operations.
     """
     
+    # Lower bounds of each confidence level above 'Very Low'
+    CONFIDENCE_THRESHOLDS = (0.3, 0.5, 0.7, 0.9)
+    CONFIDENCE_LEVELS = ('Very Low', 'Low', 'Medium', 'High', 'Very High')
+    
     def __init__(self):
         """Initialize the classifier with railway-specific categories and keywords."""
         self.railway_categories = {
@@ -145,6 +159,56 @@ class RailwayDocumentClassifier:
             'kochi', 'ernakulam', 'aluva', 'maharajas college', 'palarivattom',
             'edappally', 'kalamassery', 'cochin', 'metro station'
         ]
+        
+        # Keywords are matched against lowercased text, so lowercase them once here
+        for config in self.railway_categories.values():
+            config['keywords'] = [keyword.lower() for keyword in config['keywords']]
+        self.kmrl_keywords = [keyword.lower() for keyword in self.kmrl_keywords]
+        
+        # Every keyword the classifier looks for, each listed once
+        category_keywords = [
+            keyword
+            for config in self.railway_categories.values()
+            for keyword in config['keywords']
+        ]
+        self.all_keywords = list(dict.fromkeys(category_keywords + self.kmrl_keywords))
+        
+        # Category data as parallel lists, so scoring avoids per-category dict lookups
+        self.category_names = list(self.railway_categories)
+        self.category_keywords = [
+            tuple(config['keywords'])
+            for config in self.railway_categories.values()
+        ]
+        self.category_weights = [config['weight'] for config in self.railway_categories.values()]
+        
+        # Categories each keyword contributes to, so only matched categories are scored
+        self.keyword_categories = defaultdict(set)
+        for category, config in self.railway_categories.items():
+            for keyword in config['keywords']:
+                self.keyword_categories[keyword].add(category)
+        
+        # Aho-Corasick automaton that finds every keyword in one pass over the text
+        self.automaton = None
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for keyword in self.all_keywords:
+                self.automaton.add_word(keyword, keyword)
+            self.automaton.make_automaton()
+        
+        # Whitespace runs and punctuation are both replaced in a single pass
+        self._clean_re = re.compile(r'\s+|[^\w\s]')
+        
+        # Translation table replacing the same special characters in ASCII text
+        special_char_re = re.compile(r'[^\w\s]')
+        self._ascii_punct_table = str.maketrans({
+            chr(code): ' ' for code in range(128) if special_char_re.match(chr(code))
+        })
+        
+        # Display names are fixed per category, so format them once
+        self.display_names = {
+            category: self._build_display_name(category)
+            for category in self.railway_categories
+        }
 
     def preprocess_text(self, text: str) -> str:
         """
@@ -156,112 +220,127 @@ class RailwayDocumentClassifier:
         Returns:
             Preprocessed text
         """
-        # Convert to lowercase
         text = text.lower()
         
-        # Remove extra whitespace
-        text = ' '.join(text.split())
-        
-        # Remove special characters but keep alphanumeric and spaces
-        text = re.sub(r'[^\w\s]', ' ', text)
+        # OCR output is almost always ASCII, where str.translate beats the regex
+        if text.isascii():
+            return ' '.join(text.split()).translate(self._ascii_punct_table)
         
-        return text
+        # Collapse whitespace and replace special characters in one pass
+        return self._clean_re.sub(' ', text.strip())
 
-    def calculate_keyword_score(self, text: str, keywords: List[str], weight: float = 1.0) -> float:
+    def detect_kmrl_content(self, text: str) -> float:
         """
-        Calculate keyword-based score for a category.
+        Detect KMRL-specific content in the text.
         
         Args:
             text: Text to analyze
-            keywords: List of keywords to search for
-            weight: Weight multiplier for the category
             
         Returns:
-            Calculated score
+            KMRL relevance score (0-1)
         """
-        text = self.preprocess_text(text)
-        
-        # Count keyword occurrences
-        keyword_count = 0
-        total_keywords = len(keywords)
-        
-        for keyword in keywords:
-            keyword = keyword.lower()
-            # Check for exact keyword matches and partial matches
-            if keyword in text:
-                keyword_count += 1
-                # Give extra points for multiple occurrences
-                keyword_count += text.count(keyword) * 0.1
-        
-        # Calculate base score
-        if total_keywords > 0:
-            base_score = keyword_count / total_keywords
-        else:
-            base_score = 0
-        
-        # Apply weight and normalization
-        weighted_score = base_score * weight
+        return self.score_kmrl_content(self.count_keywords(text))
+
+    def score_kmrl_content(self, keyword_counts: Dict[str, int]) -> float:
+        """
+        Score KMRL relevance from keyword counts.
         
-        # Normalize to 0-1 range
-        normalized_score = min(weighted_score, 1.0)
+        Args:
+            keyword_counts: Result of count_keywords()
+            
+        Returns:
+            KMRL relevance score (0-1)
+        """
+        if not self.kmrl_keywords:
+            return 0.0
         
-        return normalized_score
+        kmrl_mentions = sum(1 for keyword in self.kmrl_keywords if keyword in keyword_counts)
+        return min(kmrl_mentions / len(self.kmrl_keywords) * 2, 1.0)
 
-    def detect_kmrl_content(self, text: str) -> float:
+    def count_keywords(self, text: str) -> Dict[str, int]:
         """
-        Detect KMRL-specific content in the text.
+        Count occurrences of every classifier keyword in the text.
+        
+        Counts for separate texts can be added together, so the document text
+        can be scanned while its summary is still being generated.
         
         Args:
             text: Text to analyze
             
         Returns:
-            KMRL relevance score (0-1)
+            Dictionary of keyword to occurrence count (keywords with no hits omitted)
         """
         text = self.preprocess_text(text)
         
-        kmrl_mentions = 0
-        for keyword in self.kmrl_keywords:
-            if keyword.lower() in text:
-                kmrl_mentions += 1
+        if self.automaton is not None:
+            # Counter tallies the match stream in C rather than a Python loop
+            return dict(Counter(map(itemgetter(1), self.automaton.iter(text))))
         
-        if len(self.kmrl_keywords) > 0:
-            return min(kmrl_mentions / len(self.kmrl_keywords) * 2, 1.0)
-        return 0.0
+        # Without pyahocorasick, per-keyword str.count (a C substring search) is
+        # faster than one big alternation regex, and keeps overlapping matches
+        keyword_counts = {}
+        for keyword in self.all_keywords:
+            count = text.count(keyword)
+            if count:
+                keyword_counts[keyword] = count
+        
+        return keyword_counts
 
-    def classify_document(self, text: str, summary: str = "") -> List[Dict[str, any]]:
+    def classify_document(self, text: str, summary: str = "",
+                          text_keyword_counts: Dict[str, int] = None) -> List[Dict[str, any]]:
         """
         Classify a railway document based on its content.
         
         Args:
             text: Main document text
             summary: Optional document summary
+            text_keyword_counts: Optional precomputed count_keywords(text) result
             
         Returns:
             List of classification results with categories and confidence scores
         """
-        # Combine text and summary
-        combined_text = f"{text} {summary}"
-        
-        if not combined_text.strip():
+        # isspace() checks for blank input without copying the text like strip() would
+        if (not text or text.isspace()) and (not summary or summary.isspace()):
             return [{
                 'category': 'Unknown Document',
                 'confidence': 0.1,
                 'kmrl_relevance': 0.0
             }]
         
-        # Calculate scores for each category
+        # Count keywords in the text and summary
+        if text_keyword_counts is None:
+            text_keyword_counts = self.count_keywords(text)
+        
+        keyword_counts = dict(text_keyword_counts)
+        if summary:
+            for keyword, count in self.count_keywords(summary).items():
+                keyword_counts[keyword] = keyword_counts.get(keyword, 0) + count
+        
+        # Calculate scores for each category with at least one keyword hit
+        hit_categories = set()
+        for keyword in keyword_counts:
+            hit_categories.update(self.keyword_categories.get(keyword, ()))
+        
         category_scores = {}
         
-        for category, config in self.railway_categories.items():
-            score = self.calculate_keyword_score(
-                combined_text, 
-                config['keywords'], 
-                config['weight']
-            )
-            category_scores[category] = score
+        for category, keywords, weight in zip(self.category_names, self.category_keywords,
+                                              self.category_weights):
+            if category not in hit_categories:
+                continue
+            
+            keyword_count = 0
+            for keyword in keywords:
+                count = keyword_counts.get(keyword, 0)
+                if count:
+                    keyword_count += 1
+                    # Give extra points for multiple occurrences
+                    keyword_count += count * 0.1
+            
+            weighted_score = keyword_count / len(keywords) * weight
+            category_scores[category] = min(weighted_score, 1.0)
         
         # Detect KMRL relevance
-        kmrl_score = self.detect_kmrl_content(combined_text)
+        kmrl_score = self.score_kmrl_content(keyword_counts)
         
         # Filter categories with meaningful scores
         significant_categories = [
@@ -301,6 +380,22 @@ class RailwayDocumentClassifier:
         """
         Format category name for display.
         
+        Args:
+            category: Category identifier
+            
+        Returns:
+            Formatted category name
+        """
+        display_name = self.display_names.get(category)
+        if display_name is None:
+            display_name = self._build_display_name(category)
+        return display_name
+
+    @staticmethod
+    def _build_display_name(category: str) -> str:
+        """
+        Build the display name for a category identifier.
+        
         Args:
             category: Category identifier
             
@@ -339,15 +434,13 @@ class RailwayDocumentClassifier:
             return {}
         
         top_category = classifications[0]
-        high_confidence_categories = [
-            c for c in classifications if c['confidence'] >= 0.7
-        ]
+        high_confidence_count = sum(1 for c in classifications if c['confidence'] >= 0.7)
         
         insights = {
             'primary_category': top_category['category'],
             'primary_confidence': top_category['confidence'],
             'kmrl_relevance': top_category.get('kmrl_relevance', 0.0),
-            'high_confidence_count': len(high_confidence_categories),
+            'high_confidence_count': high_confidence_count,
             'is_kmrl_document': top_category.get('kmrl_relevance', 0.0) > 0.3,
             'confidence_level': self.get_confidence_description(top_category['confidence']),
             'category_count': len(classifications)
@@ -365,32 +458,72 @@ class RailwayDocumentClassifier:
         Returns:
             Confidence description
         """
-        if confidence >= 0.9:
-            return 'Very High'
-        elif confidence >= 0.7:
-            return 'High'
-        elif confidence >= 0.5:
-            return 'Medium'
-        elif confidence >= 0.3:
-            return 'Low'
-        else:
-            return 'Very Low'
+        return self.CONFIDENCE_LEVELS[bisect.bisect_right(self.CONFIDENCE_THRESHOLDS, confidence)]
+
+
+# Classification results for recently seen texts, keyed by content digest
+CLASSIFICATION_CACHE_SIZE = 256
+_classification_cache = OrderedDict()
+_classification_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def get_classifier() -> RailwayDocumentClassifier:
+    """Return the shared classifier, building its keyword structures on first use."""
+    return RailwayDocumentClassifier()
+
+
+def _content_digest(text: str) -> bytes:
+    """Return a short digest of text for use as a cache key."""
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
 
 
 # Convenience function for direct use
-def classify_railway_document(text: str, summary: str = "") -> List[Dict[str, any]]:
+def classify_railway_document(text: str, summary: str = "",
+                              text_keyword_counts: Dict[str, int] = None) -> List[Dict[str, any]]:
     """
     Classify a railway document using the RailwayDocumentClassifier.
     
+    Results are cached by content, so classifying an identical document again
+    skips the keyword scan entirely.
+    
     Args:
         text: Document text
         summary: Optional document summary
+        text_keyword_counts: Optional precomputed count_railway_keywords(text) result
         
     Returns:
         List of classification results
     """
-    classifier = RailwayDocumentClassifier()
-    return classifier.classify_document(text, summary)
+    key = (_content_digest(text), _content_digest(summary))
+    
+    with _classification_cache_lock:
+        cached = _classification_cache.get(key)
+        if cached is not None:
+            _classification_cache.move_to_end(key)
+            return [dict(result) for result in cached]
+    
+    results = get_classifier().classify_document(text, summary, text_keyword_counts)
+    
+    with _classification_cache_lock:
+        _classification_cache[key] = [dict(result) for result in results]
+        if len(_classification_cache) > CLASSIFICATION_CACHE_SIZE:
+            _classification_cache.popitem(last=False)
+    
+    return results
+
+
+def count_railway_keywords(text: str) -> Dict[str, int]:
+    """
+    Count railway keywords in text ahead of classification.
+    
+    Args:
+        text: Document text
+        
+    Returns:
+        Dictionary of keyword to occurrence count
+    """
+    return get_classifier().count_keywords(text)
 
 
 # Example usage and testing
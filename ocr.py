@@ -1,4 +1,6 @@
 import os
+import shutil
+import tempfile
 import pymupdf  # PyMuPDF
 import pytesseract
 from PIL import Image
@@ -6,13 +8,24 @@ import cv2
 import numpy as np
 from langdetect import detect_langs
 import json
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 import logging
+from collections import deque
+from itertools import groupby
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from tesserocr import PyTessBaseAPI
+except ImportError:  # tesserocr is optional; fall back to the tesseract CLI
+    PyTessBaseAPI = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Long-lived Tesseract APIs of this worker process, per language set (see DocumentOCR.warm_tess_api())
+_tess_apis = {}
+
 class DocumentOCR:
     def __init__(self, tesseract_langs='mal+eng'):
         """
@@ -134,17 +147,7 @@ class DocumentOCR:
             Extracted text
         """
         try:
-            # Convert page to image (high resolution for better OCR)
-            mat = pymupdf.Matrix(300/72, 300/72)  # 300 DPI
-            pix = page.get_pixmap(matrix=mat)
-            
-            # Convert to numpy array
-            img_data = pix.tobytes("png")
-            nparr = np.frombuffer(img_data, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            # Preprocess image
-            processed_img = self._preprocess_image(img)
+            processed_img = self._render_pdf_page(page)
             
             # Convert to PIL Image
             pil_image = Image.fromarray(processed_img)
@@ -158,6 +161,242 @@ class DocumentOCR:
             logger.error(f"Error in OCR for page {page_num}: {str(e)}")
             return ""
     
+    def _render_pdf_page(self, page) -> np.ndarray:
+        """
+        Rasterize a PDF page and preprocess it for OCR
+        
+        Args:
+            page: PyMuPDF page object
+            
+        Returns:
+            Preprocessed page image
+        """
+        return self._preprocess_image(self._rasterize_pdf_page(page))
+    
+    def _rasterize_pdf_page(self, page) -> np.ndarray:
+        """
+        Rasterize a PDF page to a grayscale image
+        
+        Args:
+            page: PyMuPDF page object
+            
+        Returns:
+            Grayscale page image
+        """
+        # Convert page to image (high resolution for better OCR)
+        mat = pymupdf.Matrix(300/72, 300/72)  # 300 DPI
+        pix = page.get_pixmap(matrix=mat)
+        
+        # Wrap the raw RGB samples directly instead of round-tripping through PNG
+        img = np.frombuffer(pix.samples, np.uint8).reshape(pix.height, pix.width, pix.n)
+        
+        return cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    
+    def load_document_pages(self, file_path: str) -> Dict[int, Optional[str]]:
+        """
+        Read a document's embedded text without running OCR
+        
+        Args:
+            file_path: Path to document (PDF or image)
+            
+        Returns:
+            Page texts, with None for pages that need OCR (see iter_preprocessed_pages())
+        """
+        file_ext = os.path.splitext(file_path)[1].lower()
+        
+        if file_ext in ['.png', '.jpg', '.jpeg', '.tiff', '.bmp']:
+            return {1: None}
+        
+        if file_ext != '.pdf':
+            raise ValueError(f"Unsupported file type: {file_ext}")
+        
+        texts = {}
+        
+        doc = pymupdf.open(file_path)
+        try:
+            for page_num, page in enumerate(doc, 1):
+                text = page.get_text()
+                
+                # Check if page has meaningful text (threshold: 50 characters)
+                texts[page_num] = text if len(text.strip()) >= 50 else None
+        finally:
+            doc.close()
+        
+        return texts
+    
+    def iter_preprocessed_pages(self, file_path: str, page_nums: List[int],
+                                thread_count: int = 1) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Rasterize and preprocess document pages for OCR, streaming them
+        
+        Preprocessing runs on up to thread_count threads, and no more pages are
+        rasterized ahead than there are threads, so each raw raster is released
+        as soon as its processed image exists.
+        
+        Args:
+            file_path: Path to document (PDF or image)
+            page_nums: Pages to rasterize
+            thread_count: Threads used to preprocess pages
+            
+        Yields:
+            (page number, preprocessed image) tuples, in page_nums order
+        """
+        thread_count = max(1, thread_count)
+        pending = deque()
+        
+        # OpenCV releases the GIL, so denoising/thresholding runs in parallel threads
+        with ThreadPoolExecutor(max_workers=thread_count) as executor:
+            for page_num, raw_image in self._iter_raw_pages(file_path, page_nums):
+                pending.append((page_num, executor.submit(self._preprocess_image, raw_image)))
+                del raw_image
+                
+                if len(pending) >= thread_count:
+                    page_num, future = pending.popleft()
+                    yield page_num, future.result()
+            
+            while pending:
+                page_num, future = pending.popleft()
+                yield page_num, future.result()
+    
+    def _iter_raw_pages(self, file_path: str, page_nums: List[int]) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Load the raw images of document pages one at a time
+        
+        Args:
+            file_path: Path to document (PDF or image)
+            page_nums: Pages to rasterize
+            
+        Yields:
+            (page number, raw image) tuples
+        """
+        file_ext = os.path.splitext(file_path)[1].lower()
+        
+        if file_ext != '.pdf':
+            if page_nums:
+                yield 1, cv2.imread(file_path)
+            return
+        
+        # PyMuPDF documents aren't thread-safe, so rasterize sequentially
+        doc = pymupdf.open(file_path)
+        try:
+            for page_num in page_nums:
+                yield page_num, self._rasterize_pdf_page(doc[page_num - 1])
+        finally:
+            doc.close()
+    
+    def warm_tess_api(self):
+        """
+        Return this process's tesserocr API for our languages, or None without tesserocr
+        
+        The API is created the first time a page actually needs OCR, so text-only
+        documents never load a language model, and is then kept for every later
+        page and job handled by this worker process.
+        """
+        if PyTessBaseAPI is None:
+            return None
+        
+        if self.tesseract_langs not in _tess_apis:
+            try:
+                _tess_apis[self.tesseract_langs] = PyTessBaseAPI(lang=self.tesseract_langs)
+            except Exception as e:
+                logger.warning(f"Could not initialize tesserocr, using the tesseract CLI: {str(e)}")
+                _tess_apis[self.tesseract_langs] = None
+        
+        return _tess_apis[self.tesseract_langs]
+    
+    def ocr_image_with_api(self, api, image: np.ndarray) -> str:
+        """
+        OCR one image with an already-initialized tesserocr API
+        
+        Args:
+            api: tesserocr PyTessBaseAPI
+            image: Preprocessed image
+            
+        Returns:
+            Extracted text
+        """
+        try:
+            api.SetImage(Image.fromarray(image))
+            return api.GetUTF8Text()
+        except Exception as e:
+            logger.error(f"Error in OCR: {str(e)}")
+            return ""
+    
+    def write_page_image(self, batch_dir: str, index: int, image: np.ndarray) -> str:
+        """
+        Write a preprocessed page image into a batch directory
+        
+        Args:
+            batch_dir: Directory holding the batch's images
+            index: Position of the image in the batch
+            image: Preprocessed image
+            
+        Returns:
+            Path of the written image
+        """
+        image_path = os.path.join(batch_dir, f"image_{index}.png")
+        cv2.imwrite(image_path, image)
+        return image_path
+    
+    def ocr_image_files(self, image_paths: List[str], batch_dir: str) -> List[str]:
+        """
+        OCR many image files with a single Tesseract invocation
+        
+        Tesseract accepts a text file listing image paths, so the language
+        model is loaded once for the whole batch instead of once per image.
+        
+        Args:
+            image_paths: Preprocessed images written by write_page_image()
+            batch_dir: Directory for the image list file
+            
+        Returns:
+            Extracted text for each image, in input order
+        """
+        if not image_paths:
+            return []
+        
+        try:
+            list_path = os.path.join(batch_dir, 'images.txt')
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(image_paths) + '\n')
+            
+            output = pytesseract.image_to_string(list_path, lang=self.tesseract_langs)
+            
+            # Tesseract terminates every page with a form feed
+            texts = output.split('\x0c')[:len(image_paths)]
+            texts += [""] * (len(image_paths) - len(texts))
+            
+            return texts
+            
+        except Exception as e:
+            logger.error(f"Error in batched OCR: {str(e)}")
+            return [""] * len(image_paths)
+    
+    def build_page_info(self, page_num: int, text: str, method: str, output_dir: str) -> Dict:
+        """
+        Build and save the page info dictionary for one page
+        
+        Args:
+            page_num: Page number within the document
+            text: Page text
+            method: 'ocr' or 'direct'
+            output_dir: Directory to save the page text
+            
+        Returns:
+            Page information dictionary
+        """
+        page_info = {
+            'page_num': page_num,
+            'text': text,
+            'marked_text': f"[p{page_num}]\n{text}",
+            'language': self._detect_language(text),
+            'method': method
+        }
+        
+        self._save_page_text(output_dir, page_num, page_info)
+        
+        return page_info
+    
     def _preprocess_image(self, image: np.ndarray) -> np.ndarray:
         """
         Preprocess image for better OCR accuracy
@@ -323,4 +562,83 @@ def extract_document_text(file_path: str, output_dir: str, tesseract_langs='mal+
     # Get combined text
     combined_text = ocr.combine_page_texts(page_texts)
     
-    return page_texts, combined_text
\ No newline at end of file
+    return page_texts, combined_text
+
+
+def scan_document_pages(file_path: str, output_dir: str) -> Dict[int, Optional[Dict]]:
+    """
+    Read a document's embedded text, leaving scanned pages for ocr_document_pages()
+    
+    Args:
+        file_path: Path to document (PDF or image)
+        output_dir: Directory to save page texts
+        
+    Returns:
+        Page info dictionary per page, with None for pages that need OCR
+    """
+    ocr = DocumentOCR()
+    
+    return {
+        page_num: None if text is None else ocr.build_page_info(page_num, text, 'direct', output_dir)
+        for page_num, text in ocr.load_document_pages(file_path).items()
+    }
+
+
+def ocr_document_pages(pages: List[Tuple[str, int, str]], work_dir: str, tesseract_langs='mal+eng',
+                       thread_count: int = 1) -> List[Optional[Dict]]:
+    """
+    OCR scanned pages, possibly from several documents, with a single Tesseract call
+    
+    Args:
+        pages: (document path, page number, page text output directory) tuples,
+            with pages of the same document next to each other
+        work_dir: Directory for the temporary image files
+        tesseract_langs: Languages for Tesseract
+        thread_count: Threads used to preprocess rasterized pages
+        
+    Returns:
+        Page info dictionary per page, in input order (None for pages that
+        could not be rasterized)
+    """
+    ocr = DocumentOCR(tesseract_langs=tesseract_langs)
+    tess_api = ocr.warm_tess_api()
+    
+    os.makedirs(work_dir, exist_ok=True)
+    batch_dir = tempfile.mkdtemp(prefix='ocr_batch_', dir=work_dir)
+    
+    texts = [None] * len(pages)
+    image_paths = []
+    image_slots = []
+    
+    try:
+        # Open each document once for all of its pages
+        for file_path, group in groupby(enumerate(pages), key=lambda item: item[1][0]):
+            slots = {page_num: index for index, (_, page_num, _) in group}
+            
+            try:
+                # Hand each page off as soon as it is preprocessed (OCR it with
+                # the warm API, or write it out for the batch call), so only a
+                # few page images are ever in memory
+                for page_num, image in ocr.iter_preprocessed_pages(file_path, list(slots), thread_count):
+                    if tess_api is not None:
+                        texts[slots[page_num]] = ocr.ocr_image_with_api(tess_api, image)
+                    else:
+                        image_paths.append(ocr.write_page_image(batch_dir, len(image_paths), image))
+                        image_slots.append(slots[page_num])
+                    del image
+            except Exception as e:
+                logger.error(f"Error rasterizing pages of {file_path}: {str(e)}")
+        
+        logger.info(f"Running OCR on {len(pages)} page(s)")
+        ocr_texts = ocr.ocr_image_files(image_paths, batch_dir)
+        
+    finally:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+    
+    for index, text in zip(image_slots, ocr_texts):
+        texts[index] = text
+    
+    return [
+        None if text is None else ocr.build_page_info(page_num, text, 'ocr', output_dir)
+        for text, (_, page_num, output_dir) in zip(texts, pages)
+    ]
@@ -2,9 +2,20 @@ import React from 'react'
 import { FileText, Tag, Eye, Brain, Download, Clock, Globe, FileCheck } from 'lucide-react'
 import { motion } from 'framer-motion'
 import clsx from 'clsx'
+import { apiService } from '../services/api'
 
 const ResultsTab = ({ data, files }) => {
   const handleDownload = (type) => {
+    // Full results are stored on the server; the response only has a preview
+    if (data?.job_id) {
+      const a = document.createElement('a')
+      a.href = apiService.getDownloadUrl(data.job_id, type)
+      document.body.appendChild(a)
+      a.click()
+      document.body.removeChild(a)
+      return
+    }
+
     let content = ''
     let filename = ''
 
@@ -221,6 +232,11 @@ const ResultsTab = ({ data, files }) => {
             <pre className="text-sm text-gray-800 whitespace-pre-wrap font-mono">
               {data.ocr_text || 'No OCR text available'}
             </pre>
+            {data.ocr_text && data.metadata?.total_characters > data.ocr_text.length && (
+              <p className="mt-2 text-xs text-gray-500">
+                Showing a preview. Download for the full text.
+              </p>
+            )}
           </div>
         </div>
       </motion.div>
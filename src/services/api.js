@@ -8,6 +8,9 @@ const api = axios.create({
 	timeout: 300000, // 5 minutes for processing
 });
 
+const PROCESS_POLL_INTERVAL = 2000;
+const PROCESS_TIMEOUT = 300000; // 5 minutes overall for a processing task
+
 export const apiService = {
 	// Health check
 	healthCheck: async () => {
@@ -40,7 +43,7 @@ export const apiService = {
 		return response.data;
 	},
 
-	// Process documents
+	// Process documents (runs as a background task on the server)
 	processDocuments: async (uploadedFiles, options = {}) => {
 		const response = await api.post("/process", {
 			files: uploadedFiles,
@@ -48,7 +51,20 @@ export const apiService = {
 			classification_mode: options.classificationMode || "railway",
 		});
 
-		return response.data;
+		const { task_id: taskId } = response.data;
+
+		// Poll until the task finishes; failures surface as HTTP errors
+		const deadline = Date.now() + PROCESS_TIMEOUT;
+		while (Date.now() < deadline) {
+			await new Promise((resolve) => setTimeout(resolve, PROCESS_POLL_INTERVAL));
+
+			const status = await api.get(`/process/status/${taskId}`);
+			if (status.data.status === "completed") {
+				return status.data.result;
+			}
+		}
+
+		throw new Error("Processing timed out");
 	},
 
 	// Chat with documents
@@ -61,6 +77,9 @@ export const apiService = {
 		return response.data;
 	},
 
+	// URL of a stored processing result (full OCR text or summary)
+	getDownloadUrl: (jobId, dataType) => `${API_BASE_URL}/download/${jobId}/${dataType}`,
+
 	// Download data
 	downloadData: async (dataType, data) => {
 		const response = await api.post(`/download/${dataType}`, data);
@@ -5,12 +5,17 @@ Run this after starting the backend server to test chat responses
 """
 
 import requests
-import json
-import time
+from concurrent.futures import ThreadPoolExecutor
+from backend_client import BackendSession
 
 # Configuration
 API_BASE = "http://localhost:5000/api"
 
+# Test questions sent to the backend at once
+MAX_CONCURRENT_REQUESTS = 6
+
+SESSION = BackendSession(MAX_CONCURRENT_REQUESTS)
+
 def test_chat_functionality():
     """Test the AI chat functionality with sample processed data"""
     
@@ -55,33 +60,40 @@ def test_chat_functionality():
     print(f"📋 Testing with sample document: {sample_processed_data['document_type']}")
     print()
     
-    for i, question in enumerate(test_questions, 1):
-        print(f"🤔 Question {i}: {question}")
-        
-        try:
-            # Make chat request
-            response = requests.post(
+    # Questions are independent, so send them concurrently and print in order
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        futures = [
+            executor.submit(
+                SESSION.post_json,
                 f"{API_BASE}/chat",
-                json={
+                {
                     "message": question,
                     "processed_data": sample_processed_data
-                },
-                timeout=30
+                }
             )
+            for question in test_questions
+        ]
+        
+        for i, (question, future) in enumerate(zip(test_questions, futures), 1):
+            print(f"🤔 Question {i}: {question}")
             
-            if response.status_code == 200:
-                data = response.json()
-                print(f"🤖 AI Response: {data['response']}")
-            else:
-                print(f"❌ Error: {response.status_code} - {response.text}")
+            try:
+                response = future.result()
                 
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Connection Error: {e}")
-            print("💡 Make sure the backend server is running on localhost:5000")
-            break
-        
-        print("-" * 80)
-        time.sleep(1)  # Small delay between requests
+                if response.status_code == 200:
+                    data = response.json()
+                    print(f"🤖 AI Response: {data['response']}")
+                else:
+                    print(f"❌ Error: {response.status_code} - {response.text}")
+                    
+            except requests.exceptions.RequestException as e:
+                print(f"❌ Connection Error: {e}")
+                print("💡 Make sure the backend server is running on localhost:5000")
+                for pending in futures:
+                    pending.cancel()
+                break
+            
+            print("-" * 80)
     
     print()
     print("✅ Chat testing completed!")
@@ -94,7 +106,7 @@ def test_chat_functionality():
 def test_health():
     """Test if the backend is running"""
     try:
-        response = requests.get(f"{API_BASE}/health", timeout=5)
+        response = SESSION.get(f"{API_BASE}/health", timeout=5)
         if response.status_code == 200:
             print("✅ Backend server is running")
             return True
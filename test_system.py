@@ -3,20 +3,25 @@
 Test script for Railway Document Intelligence System
 """
 
-import requests
-import json
 import time
-import os
+import pathlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from backend_client import BackendSession
 
 # Configuration
 BACKEND_URL = "http://localhost:5000/api"
-TEST_FILES_DIR = "test_files"
+
+# Chat messages sent to the backend at once
+MAX_CONCURRENT_REQUESTS = 3
+
+SESSION = BackendSession(MAX_CONCURRENT_REQUESTS)
 
 def test_health_check():
     """Test the health check endpoint"""
     print("🔍 Testing health check...")
     try:
-        response = requests.get(f"{BACKEND_URL}/health")
+        response = SESSION.get(f"{BACKEND_URL}/health")
         if response.status_code == 200:
             print("✅ Health check passed")
             return True
@@ -27,17 +32,11 @@ def test_health_check():
         print(f"❌ Health check error: {e}")
         return False
 
-def test_file_upload():
+def test_file_upload(test_file_path):
     """Test file upload functionality"""
     print("\n📤 Testing file upload...")
     
-    # Create a test file if it doesn't exist
-    if not os.path.exists(TEST_FILES_DIR):
-        os.makedirs(TEST_FILES_DIR)
-    
-    test_file_path = os.path.join(TEST_FILES_DIR, "test.txt")
-    with open(test_file_path, "w") as f:
-        f.write("Railway Safety Manual\n\nThis is a test document for railway safety procedures.\nEmergency protocols and safety guidelines are outlined here.")
+    test_file_path.write_text("Railway Safety Manual\n\nThis is a test document for railway safety procedures.\nEmergency protocols and safety guidelines are outlined here.")
     
     try:
         with open(test_file_path, "rb") as f:
@@ -47,7 +46,7 @@ def test_file_upload():
                 "classificationMode": "railway"
             }
             
-            response = requests.post(f"{BACKEND_URL}/upload", files=files, data=data)
+            response = SESSION.post(f"{BACKEND_URL}/upload", files=files, data=data)
             
         if response.status_code == 200:
             print("✅ File upload successful")
@@ -75,10 +74,19 @@ def test_document_processing(upload_result):
             "classification_mode": "railway"
         }
         
-        response = requests.post(f"{BACKEND_URL}/process", json=payload)
+        response = SESSION.post_json(f"{BACKEND_URL}/process", payload)
+        
+        # Processing runs in the background; poll until it finishes
+        if response.status_code == 202:
+            task_id = response.json()["task_id"]
+            while True:
+                time.sleep(2)
+                response = SESSION.get(f"{BACKEND_URL}/process/status/{task_id}")
+                if response.status_code != 200 or response.json().get("status") != "processing":
+                    break
         
         if response.status_code == 200:
-            result = response.json()
+            result = response.json()["result"]
             print("✅ Document processing successful")
             print(f"   Document Type: {result.get('document_type', 'Unknown')}")
             print(f"   Classifications: {len(result.get('classification', []))}")
@@ -106,24 +114,33 @@ def test_chat_functionality(processed_data):
         "Find safety information"
     ]
     
-    for message in test_messages:
-        try:
-            payload = {
-                "message": message,
-                "processed_data": processed_data
-            }
-            
-            response = requests.post(f"{BACKEND_URL}/chat", json=payload)
-            
-            if response.status_code == 200:
-                result = response.json()
-                print(f"✅ Chat response for '{message}': {len(result.get('response', ''))} characters")
-            else:
-                print(f"❌ Chat failed for '{message}': {response.status_code}")
+    # Messages are independent, so send them concurrently and check in order
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        futures = [
+            executor.submit(
+                SESSION.post_json,
+                f"{BACKEND_URL}/chat",
+                {
+                    "message": message,
+                    "processed_data": processed_data
+                }
+            )
+            for message in test_messages
+        ]
+        
+        for message, future in zip(test_messages, futures):
+            try:
+                response = future.result()
+                
+                if response.status_code == 200:
+                    result = response.json()
+                    print(f"✅ Chat response for '{message}': {len(result.get('response', ''))} characters")
+                else:
+                    print(f"❌ Chat failed for '{message}': {response.status_code}")
+                    return False
+            except Exception as e:
+                print(f"❌ Chat error for '{message}': {e}")
                 return False
-        except Exception as e:
-            print(f"❌ Chat error for '{message}': {e}")
-            return False
     
     return True
 
@@ -137,14 +154,16 @@ def main():
         print("Please start the Flask server with: python app.py")
         return
     
-    # Test 2: File Upload
-    upload_result = test_file_upload()
-    
-    # Test 3: Document Processing
-    processed_data = test_document_processing(upload_result)
-    
-    # Test 4: Chat Functionality
-    chat_success = test_chat_functionality(processed_data)
+    # Test files live in a temporary directory that is removed even if a test fails
+    with tempfile.TemporaryDirectory() as test_files_dir:
+        # Test 2: File Upload
+        upload_result = test_file_upload(pathlib.Path(test_files_dir) / "test.txt")
+        
+        # Test 3: Document Processing
+        processed_data = test_document_processing(upload_result)
+        
+        # Test 4: Chat Functionality
+        chat_success = test_chat_functionality(processed_data)
     
     # Summary
     print("\n" + "="*50)
@@ -158,12 +177,6 @@ def main():
         print("\n🎉 All tests passed! The system is working correctly.")
     else:
         print("\n⚠️ Some tests failed. Please check the backend setup and configuration.")
-    
-    # Cleanup
-    if os.path.exists(TEST_FILES_DIR):
-        import shutil
-        shutil.rmtree(TEST_FILES_DIR)
-        print(f"\n🧹 Cleaned up test files")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file